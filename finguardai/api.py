@@ -4,9 +4,12 @@ import os
 from werkzeug.utils import secure_filename
 import hashlib
 from .mistral import MistralInvoiceProcessor
+from .store import InvoiceStore, normalize_date
+from .export import ParquetExporter
 import json
 import logging
 import traceback
+import atexit
 
 # Configure logging
 logging.basicConfig(
@@ -55,6 +58,15 @@ os.makedirs(UPLOAD_FOLDER, exist_ok=True)
 app.config['UPLOAD_FOLDER'] = UPLOAD_FOLDER
 app.config['MAX_CONTENT_LENGTH'] = MAX_CONTENT_LENGTH
 
+# Configure invoice history settings
+DATABASE_PATH = os.environ.get('FINGUARD_DB_PATH', 'finguard.db')
+DEFAULT_PAGE_SIZE = 20
+MAX_PAGE_SIZE = 100
+RISK_LEVELS = {'high', 'medium', 'low'}
+
+# Configure analytics export settings
+ANALYTICS_PATH = os.environ.get('FINGUARD_ANALYTICS_PATH', 'analytics')
+
 # Initialize Mistral processor
 try:
     processor = MistralInvoiceProcessor()
@@ -63,6 +75,14 @@ except Exception as e:
     logger.error(f"Failed to initialize Mistral processor: {str(e)}")
     raise
 
+# Initialize invoice history store
+store = InvoiceStore(DATABASE_PATH)
+
+# Initialize analytics exporter. Its background thread starts with the first
+# processed invoice, so a reloader's file-watching process never runs one.
+exporter = ParquetExporter(ANALYTICS_PATH)
+atexit.register(exporter.stop)
+
 def allowed_file(filename):
     return '.' in filename and filename.rsplit('.', 1)[1].lower() in ALLOWED_EXTENSIONS
 
@@ -126,9 +146,24 @@ def process_invoice():
             action_hash = generate_action_hash(invoice_data)
             logger.info(f"Generated action hash: {action_hash}")
 
+            # Persist result; a storage failure should not lose the response
+            invoice_id = None
+            try:
+                invoice_id = store.save(invoice_data, risk_assessment, action_hash)
+                logger.info(f"Stored invoice with id: {invoice_id}")
+            except Exception as e:
+                logger.error(f"Failed to store invoice: {str(e)}")
+
+            # Queue for the analytics export; written in the background
+            try:
+                exporter.append(invoice_data, risk_assessment, action_hash, invoice_id)
+            except Exception as e:
+                logger.error(f"Failed to queue invoice for export: {str(e)}")
+
             result = {
                 "success": True,
                 "data": {
+                    "invoice_id": invoice_id,
                     "invoice_data": invoice_data,
                     "risk_assessment": risk_assessment,
                     "action_hash": action_hash
@@ -158,6 +193,74 @@ def process_invoice():
         "error": "Invalid file type"
     }), 400
 
+@app.route('/api/invoices', methods=['GET'])
+def list_invoices():
+    try:
+        limit = int(request.args.get('limit', DEFAULT_PAGE_SIZE))
+    except ValueError:
+        return jsonify({"success": False, "error": "limit must be an integer"}), 400
+    if not 1 <= limit <= MAX_PAGE_SIZE:
+        return jsonify({
+            "success": False,
+            "error": f"limit must be between 1 and {MAX_PAGE_SIZE}"
+        }), 400
+
+    filters = {
+        'vendor': request.args.get('vendor'),
+        'date_from': request.args.get('date_from'),
+        'date_to': request.args.get('date_to'),
+        'risk_level': request.args.get('risk_level'),
+    }
+    for key in ('date_from', 'date_to'):
+        if filters[key]:
+            try:
+                filters[key] = normalize_date(filters[key])
+            except ValueError:
+                return jsonify({"success": False, "error": f"{key} must be YYYY-MM-DD"}), 400
+    if filters['risk_level'] and filters['risk_level'].lower() not in RISK_LEVELS:
+        return jsonify({
+            "success": False,
+            "error": f"risk_level must be one of: {', '.join(sorted(RISK_LEVELS))}"
+        }), 400
+    cursor = request.args.get('cursor')
+
+    # Stored results are immutable, so the newest id identifies every page's contents
+    etag = generate_action_hash({
+        'revision': store.latest_id(),
+        'limit': limit,
+        'cursor': cursor,
+        **filters
+    })
+    if etag in request.if_none_match:
+        response = app.response_class(status=304)
+        response.set_etag(etag)
+        return response
+
+    try:
+        invoices, next_cursor = store.list_summaries(limit=limit, cursor=cursor, **filters)
+    except ValueError as e:
+        return jsonify({"success": False, "error": str(e)}), 400
+
+    response = jsonify({
+        "success": True,
+        "data": {
+            "invoices": invoices,
+            "next_cursor": next_cursor
+        }
+    })
+    response.set_etag(etag)
+    return response
+
+@app.route('/api/invoices/<int:invoice_id>', methods=['GET'])
+def get_invoice(invoice_id):
+    invoice = store.get(invoice_id)
+    if invoice is None:
+        return jsonify({"success": False, "error": "Invoice not found"}), 404
+
+    response = jsonify({"success": True, "data": invoice})
+    response.set_etag(f"{invoice_id}-{invoice['action_hash']}")
+    return response.make_conditional(request)
+
 @app.route('/api/health', methods=['GET'])
 def health_check():
     return jsonify({"status": "healthy"})
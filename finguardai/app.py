@@ -55,6 +55,26 @@ st.markdown("""
 > End-to-end AI-powered invoice extraction, risk assessment, and logging using Mistral-7B.
 """)
 
+# Recent invoices from the backend history
+with st.sidebar:
+    st.subheader("🕘 Recent Invoices")
+    try:
+        response = requests.get(f"{BACKEND_URL}/api/invoices", params={"limit": 10}, timeout=10)
+        if response.status_code == 200 and response.json()["success"]:
+            recents = response.json()["data"]["invoices"]
+            if not recents:
+                st.caption("Processed invoices will appear here")
+            for invoice in recents:
+                st.markdown(
+                    f"**{invoice['vendor'] or 'Unknown Vendor'}** · {invoice['invoice_date'] or '-'}  \n"
+                    f"${(invoice['total_amount'] or 0):.2f} · Risk: {(invoice['risk_level'] or 'unknown').upper()}"
+                )
+        else:
+            st.caption("Could not load recent invoices")
+    except requests.exceptions.RequestException as e:
+        logger.error(f"Failed to load recent invoices: {str(e)}")
+        st.caption("Could not load recent invoices")
+
 # File uploader
 uploaded_file = st.file_uploader("Upload Invoice (PDF/Image)", type=['pdf', 'png', 'jpg', 'jpeg'])
 
@@ -0,0 +1,464 @@
+import argparse
+import fcntl
+import hashlib
+import json
+import logging
+import os
+import shutil
+import threading
+import uuid
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional
+from urllib.parse import quote
+
+import pyarrow as pa
+import pyarrow.dataset as ds
+import pyarrow.parquet as pq
+
+from .store import normalize_date
+
+logger = logging.getLogger(__name__)
+
+TABLES = ("invoices", "line_items", "findings")
+LOCK_FILE = ".lock"
+# Dot-prefixed so they sit outside the table directories dataset readers scan
+STAGING_DIR = ".staging"
+QUARANTINE_DIR = ".quarantine"
+# Encoded partition values longer than this are shortened to stay well under NAME_MAX
+MAX_PARTITION_VALUE_LENGTH = 120
+
+
+def _schemas() -> Dict[str, pa.Schema]:
+    # Partition columns (date, vendor) live in the directory names, not the files
+    common = [
+        ("invoice_id", pa.int64()),
+        ("action_hash", pa.string()),
+        ("invoice_number", pa.string()),
+        ("processed_at", pa.timestamp("s", tz="UTC")),
+    ]
+    return {
+        "invoices": pa.schema(common + [
+            ("total_amount", pa.float64()),
+            ("risk_level", pa.string()),
+            ("confidence_score", pa.float64()),
+            ("line_item_count", pa.int32()),
+            ("finding_count", pa.int32()),
+        ]),
+        "line_items": pa.schema(common + [
+            ("name", pa.string()),
+            ("quantity", pa.float64()),
+            ("price", pa.float64()),
+        ]),
+        "findings": pa.schema(common + [
+            ("risk_level", pa.string()),
+            ("finding", pa.string()),
+        ]),
+    }
+
+
+def _partitioning() -> ds.Partitioning:
+    return ds.partitioning(
+        pa.schema([("date", pa.string()), ("vendor", pa.string())]),
+        flavor="hive"
+    )
+
+
+def _with_partitions(schema: pa.Schema) -> pa.Schema:
+    return schema.append(pa.field("date", pa.string())).append(pa.field("vendor", pa.string()))
+
+
+def _partition_value(value: Optional[str]) -> Optional[str]:
+    """Shorten values whose encoded directory name would be too long for the filesystem."""
+    if value is None or len(quote(value, safe="")) <= MAX_PARTITION_VALUE_LENGTH:
+        return value
+    digest = hashlib.sha256(value.encode()).hexdigest()[:16]
+    prefix = ""
+    for char in value:
+        if len(quote(prefix + char, safe="")) > MAX_PARTITION_VALUE_LENGTH - len(digest) - 1:
+            break
+        prefix += char
+    return f"{prefix}~{digest}"
+
+
+@contextmanager
+def _locked(root: str, operation: int):
+    """Hold an flock on the export's lock file: LOCK_EX for writers, LOCK_SH for readers."""
+    # flock locks belong to the open file, so this also excludes other threads
+    with open(os.path.join(root, LOCK_FILE), "a") as lock_file:
+        fcntl.flock(lock_file, operation)
+        try:
+            yield
+        finally:
+            fcntl.flock(lock_file, fcntl.LOCK_UN)
+
+
+def _partition_date(value: Any) -> Optional[str]:
+    # Unparseable dates go to the null partition, matching the history store
+    try:
+        return normalize_date(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def _str_or_none(value: Any) -> Optional[str]:
+    return None if value is None else str(value)
+
+
+def _float_or_none(value: Any) -> Optional[float]:
+    try:
+        return float(value)
+    except (TypeError, ValueError):
+        return None
+
+
+class ParquetExporter:
+    """Appends processed invoices to date/vendor partitioned Parquet datasets.
+
+    Rows are buffered in memory and written by a background thread, started
+    by the first ``append``. It flushes when ``batch_size`` invoices are
+    pending or every ``flush_interval`` seconds, so ``append`` never does
+    file I/O on the request path. Small files produced by frequent flushes
+    are merged by ``compact``, which the background thread also runs every
+    ``compact_interval`` seconds.
+
+    Writes and compaction hold an exclusive ``flock`` on a file under
+    ``root`` and ``query`` holds a shared one, so several processes (API
+    workers, the CLI) can share one export directory.
+    Each batch is written to a staging directory and only moved into the
+    table once it is complete. Rows that cannot be written are set aside
+    as JSON lines under ``.quarantine`` rather than retried forever.
+
+    Invoice dates are stored as YYYY-MM-DD, or null when they do not parse.
+    Vendor names too long for a directory name are shortened to a prefix
+    plus a hash, so exact vendor filters will not match them.
+    """
+
+    def __init__(self, root: str, batch_size: int = 100, flush_interval: float = 30.0,
+                 compact_interval: float = 3600.0, compact_min_files: int = 8):
+        self.root = root
+        self.batch_size = batch_size
+        self.flush_interval = flush_interval
+        self.compact_interval = compact_interval
+        self.compact_min_files = compact_min_files
+        self.schemas = _schemas()
+
+        self._lock = threading.Lock()
+        self._buffers: Dict[str, List[Dict[str, Any]]] = {name: [] for name in TABLES}
+        self._pending = 0
+        self._wake = threading.Event()
+        self._stop = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        os.makedirs(root, exist_ok=True)
+
+    def _exclusive(self):
+        return _locked(self.root, fcntl.LOCK_EX)
+
+    def start(self):
+        """Start the background flush/compaction thread; ``append`` calls this on first use."""
+        with self._lock:
+            if self._thread is not None or self._stop.is_set():
+                return
+            self._thread = threading.Thread(target=self._run, name="parquet-exporter", daemon=True)
+            self._thread.start()
+        logger.info(f"Parquet exporter writing to: {self.root}")
+
+    def stop(self):
+        """Stop the background thread and flush anything still buffered."""
+        self._stop.set()
+        self._wake.set()
+        if self._thread is not None:
+            self._thread.join()
+            self._thread = None
+        self.flush()
+
+    def _run(self):
+        last_compaction = datetime.now(timezone.utc)
+        while not self._stop.is_set():
+            self._wake.wait(self.flush_interval)
+            self._wake.clear()
+            try:
+                self.flush()
+                now = datetime.now(timezone.utc)
+                if (now - last_compaction).total_seconds() >= self.compact_interval:
+                    self.compact()
+                    last_compaction = now
+            except Exception as e:
+                logger.error(f"Parquet export failed: {str(e)}")
+
+    def append(self, invoice_data: Dict[str, Any], risk_assessment: Dict[str, Any],
+               action_hash: str, invoice_id: Optional[int] = None):
+        """Buffer one processed invoice with its line items and risk findings."""
+        line_items = invoice_data.get("line_items") or []
+        findings = risk_assessment.get("findings") or []
+        risk_level = risk_assessment.get("risk_level")
+        risk_level = risk_level.lower() if isinstance(risk_level, str) else None
+        common = {
+            "invoice_id": invoice_id,
+            "action_hash": action_hash,
+            "invoice_number": _str_or_none(invoice_data.get("invoice_number")),
+            "processed_at": datetime.now(timezone.utc).replace(microsecond=0),
+            "date": _partition_date(invoice_data.get("date")),
+            "vendor": _partition_value(_str_or_none(invoice_data.get("vendor"))),
+        }
+
+        with self._lock:
+            self._buffers["invoices"].append({
+                **common,
+                "total_amount": _float_or_none(invoice_data.get("total_amount")),
+                "risk_level": risk_level,
+                "confidence_score": _float_or_none(risk_assessment.get("confidence_score")),
+                "line_item_count": len(line_items),
+                "finding_count": len(findings),
+            })
+            for item in line_items:
+                self._buffers["line_items"].append({
+                    **common,
+                    "name": _str_or_none(item.get("name")),
+                    "quantity": _float_or_none(item.get("quantity")),
+                    "price": _float_or_none(item.get("price")),
+                })
+            for finding in findings:
+                self._buffers["findings"].append({
+                    **common,
+                    "risk_level": risk_level,
+                    "finding": _str_or_none(finding),
+                })
+            self._pending += 1
+            if self._pending >= self.batch_size:
+                self._wake.set()
+
+        # Started lazily so processes that never serve requests (e.g. a reloader's watcher) stay idle
+        if self._thread is None:
+            self.start()
+
+    def flush(self):
+        """Write all buffered rows as new Parquet files."""
+        with self._lock:
+            buffers = self._buffers
+            self._buffers = {name: [] for name in TABLES}
+            self._pending = 0
+        if not any(buffers.values()):
+            return
+
+        with self._exclusive():
+            # Left behind by a flush that crashed; never visible to readers
+            shutil.rmtree(os.path.join(self.root, STAGING_DIR), ignore_errors=True)
+            for name, rows in buffers.items():
+                if rows:
+                    self._export_rows(name, rows)
+
+    def _export_rows(self, name: str, rows: List[Dict[str, Any]]):
+        try:
+            self._write(name, rows)
+            logger.info(f"Exported {len(rows)} rows to {name}")
+            return
+        except Exception as e:
+            logger.warning(f"Failed to export {len(rows)} rows to {name}, retrying by partition: {str(e)}")
+
+        # Retry each partition alone so one bad partition does not hold back the rest
+        partitions: Dict[tuple, List[Dict[str, Any]]] = {}
+        for row in rows:
+            partitions.setdefault((row["date"], row["vendor"]), []).append(row)
+        for (date, vendor), partition_rows in partitions.items():
+            try:
+                self._write(name, partition_rows)
+                logger.info(f"Exported {len(partition_rows)} rows to {name}")
+            except Exception as e:
+                logger.error(f"Quarantining {len(partition_rows)} rows for {name} "
+                             f"(date={date}, vendor={vendor}): {str(e)}")
+                self._quarantine(name, partition_rows)
+
+    def _write(self, name: str, rows: List[Dict[str, Any]]):
+        table = pa.Table.from_pylist(rows, schema=_with_partitions(self.schemas[name]))
+        staging = os.path.join(self.root, STAGING_DIR, uuid.uuid4().hex)
+        try:
+            ds.write_dataset(
+                table,
+                staging,
+                format="parquet",
+                partitioning=_partitioning(),
+                basename_template=f"part-{uuid.uuid4().hex}-{{i}}.parquet",
+                existing_data_behavior="overwrite_or_ignore",
+            )
+            self._publish(staging, os.path.join(self.root, name))
+        finally:
+            shutil.rmtree(staging, ignore_errors=True)
+
+    def _publish(self, staging: str, table_root: str):
+        """Move completed files from a staging directory into the live table."""
+        moves = []
+        for dirpath, _, filenames in os.walk(staging):
+            target_dir = os.path.join(table_root, os.path.relpath(dirpath, staging))
+            moves.extend((os.path.join(dirpath, f), os.path.join(target_dir, f)) for f in filenames)
+        # Create every directory first so a failure here leaves nothing half published
+        for _, target in moves:
+            os.makedirs(os.path.dirname(target), exist_ok=True)
+        for source, target in moves:
+            os.replace(source, target)
+
+    def _quarantine(self, name: str, rows: List[Dict[str, Any]]):
+        path = os.path.join(self.root, QUARANTINE_DIR, f"{name}.jsonl")
+        try:
+            os.makedirs(os.path.dirname(path), exist_ok=True)
+            with open(path, "a") as f:
+                for row in rows:
+                    f.write(json.dumps(row, default=str) + "\n")
+        except Exception as e:
+            logger.error(f"Dropping {len(rows)} rows for {name}, quarantine failed: {str(e)}")
+
+    def compact(self):
+        """Merge partitions holding many small files into a single file each."""
+        with self._exclusive():
+            for name in TABLES:
+                table_root = os.path.join(self.root, name)
+                for dirpath, _, filenames in os.walk(table_root):
+                    try:
+                        self._recover_compaction(dirpath, filenames)
+                        parts = sorted(f for f in os.listdir(dirpath)
+                                       if f.endswith(".parquet") and not f.startswith((".", "_")))
+                        if len(parts) >= self.compact_min_files:
+                            self._compact_partition(dirpath, parts)
+                    except Exception as e:
+                        # Leave this partition as it is; its sources are only removed after a merge is published
+                        logger.error(f"Failed to compact {dirpath}: {str(e)}")
+
+    def _compact_partition(self, dirpath: str, parts: List[str]):
+        token = uuid.uuid4().hex
+        # Dot-prefixed files are ignored by dataset readers until renamed
+        tmp_path = os.path.join(dirpath, f".compact-{token}.parquet")
+        journal_path = os.path.join(dirpath, f".compact-{token}.json")
+        target = f"part-{token}-0.parquet"
+
+        # ParquetFile reads only the file's own columns, without partition inference
+        merged = pa.concat_tables([pq.ParquetFile(os.path.join(dirpath, f)).read() for f in parts])
+        pq.write_table(merged, tmp_path)
+
+        # The journal lets a later run finish removing sources after a crash
+        with open(journal_path + ".tmp", "w") as f:
+            json.dump({"target": target, "sources": parts}, f)
+        os.replace(journal_path + ".tmp", journal_path)
+
+        os.replace(tmp_path, os.path.join(dirpath, target))
+        self._finish_compaction(dirpath, journal_path)
+        logger.info(f"Compacted {len(parts)} files in {dirpath}")
+
+    def _finish_compaction(self, dirpath: str, journal_path: str):
+        with open(journal_path) as f:
+            journal = json.load(f)
+        if os.path.exists(os.path.join(dirpath, journal["target"])):
+            for source in journal["sources"]:
+                path = os.path.join(dirpath, source)
+                if os.path.exists(path):
+                    os.remove(path)
+        os.remove(journal_path)
+
+    def _recover_compaction(self, dirpath: str, filenames: List[str]):
+        """Clean up after a compaction that was interrupted part way."""
+        for filename in filenames:
+            path = os.path.join(dirpath, filename)
+            if filename.startswith(".compact-") and filename.endswith(".json"):
+                logger.warning(f"Recovering interrupted compaction in {dirpath}")
+                self._finish_compaction(dirpath, path)
+        for filename in filenames:
+            # Merged files that were never published; their sources are still in place
+            if filename.startswith(".compact-") and not filename.endswith(".json"):
+                path = os.path.join(dirpath, filename)
+                if os.path.exists(path):
+                    os.remove(path)
+
+
+def query(root: str, table: str = "invoices", vendor: Optional[str] = None,
+          date_from: Optional[str] = None, date_to: Optional[str] = None,
+          risk_level: Optional[str] = None, columns: Optional[List[str]] = None) -> pa.Table:
+    """Read an exported table, pushing filters down to partitions and row groups."""
+    if table not in TABLES:
+        raise ValueError(f"table must be one of: {', '.join(TABLES)}")
+
+    schema = _with_partitions(_schemas()[table])
+    if risk_level and "risk_level" not in schema.names:
+        raise ValueError(f"risk_level filter is not supported for {table}")
+
+    table_root = os.path.join(root, table)
+    if not os.path.isdir(table_root):
+        empty = schema.empty_table()
+        return empty.select(columns) if columns else empty
+
+    predicates = []
+    if vendor:
+        predicates.append(ds.field("vendor") == vendor)
+    if date_from:
+        predicates.append(ds.field("date") >= date_from)
+    if date_to:
+        predicates.append(ds.field("date") <= date_to)
+    if risk_level:
+        predicates.append(ds.field("risk_level") == risk_level.lower())
+
+    expression = None
+    for predicate in predicates:
+        expression = predicate if expression is None else expression & predicate
+    # A shared lock keeps flushes and compactions from changing files while they are read
+    with _locked(root, fcntl.LOCK_SH):
+        dataset = ds.dataset(table_root, schema=schema, format="parquet", partitioning=_partitioning())
+        return dataset.to_table(columns=columns, filter=expression)
+
+
+def _iso_date(value: str) -> str:
+    try:
+        return normalize_date(value)
+    except ValueError:
+        raise argparse.ArgumentTypeError(f"invalid date {value!r}, expected YYYY-MM-DD")
+
+
+def main(argv: Optional[List[str]] = None):
+    parser = argparse.ArgumentParser(description="Query and maintain the FinGuard AI analytics export")
+    parser.add_argument("--root", default=os.environ.get("FINGUARD_ANALYTICS_PATH", "analytics"),
+                        help="Export directory (default: $FINGUARD_ANALYTICS_PATH or ./analytics)")
+    subparsers = parser.add_subparsers(dest="command", required=True)
+
+    query_parser = subparsers.add_parser("query", help="Query an exported table")
+    query_parser.add_argument("table", choices=TABLES)
+    query_parser.add_argument("--vendor")
+    query_parser.add_argument("--date-from", type=_iso_date, help="YYYY-MM-DD")
+    query_parser.add_argument("--date-to", type=_iso_date, help="YYYY-MM-DD")
+    query_parser.add_argument("--risk-level", choices=["high", "medium", "low"])
+    query_parser.add_argument("--columns", help="Comma-separated columns to read")
+    query_parser.add_argument("--group-by", help="Comma-separated columns to group and count by")
+    query_parser.add_argument("--sum", help="Column to sum within each group")
+    query_parser.add_argument("--output", help="Write results to a .csv or .parquet file instead of printing")
+
+    subparsers.add_parser("compact", help="Merge small files in every partition")
+
+    args = parser.parse_args(argv)
+
+    if args.command == "compact":
+        ParquetExporter(args.root, compact_min_files=2).compact()
+        return
+
+    columns = args.columns.split(",") if args.columns else None
+    try:
+        result = query(
+            args.root, args.table, vendor=args.vendor, date_from=args.date_from,
+            date_to=args.date_to, risk_level=args.risk_level, columns=columns
+        )
+        if args.group_by:
+            # count_all counts rows, so groups with a null key are not reported as empty
+            aggregations = [([], "count_all")]
+            if args.sum:
+                aggregations.append((args.sum, "sum"))
+            result = result.group_by(args.group_by.split(",")).aggregate(aggregations)
+    except (ValueError, KeyError, pa.ArrowException) as e:
+        query_parser.error(str(e))
+
+    if args.output:
+        if args.output.endswith(".parquet"):
+            pq.write_table(result, args.output)
+        else:
+            result.to_pandas().to_csv(args.output, index=False)
+        print(f"Wrote {result.num_rows} rows to {args.output}")
+    else:
+        print(result.to_pandas().to_string(index=False))
+
+
+if __name__ == "__main__":
+    main()
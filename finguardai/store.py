@@ -0,0 +1,174 @@
+import base64
+import binascii
+import json
+import logging
+import sqlite3
+from contextlib import contextmanager
+from datetime import datetime, timezone
+from typing import Dict, Any, List, Optional, Tuple
+
+logger = logging.getLogger(__name__)
+
+# Columns returned for list views; the full payload is only read for detail lookups
+SUMMARY_COLUMNS = (
+    "id", "action_hash", "vendor", "invoice_date", "invoice_number",
+    "total_amount", "risk_level", "confidence_score", "line_item_count",
+    "processed_at",
+)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS invoices (
+    id INTEGER PRIMARY KEY AUTOINCREMENT,
+    action_hash TEXT NOT NULL,
+    vendor TEXT COLLATE NOCASE,
+    invoice_date TEXT,
+    invoice_number TEXT,
+    total_amount REAL,
+    risk_level TEXT,
+    confidence_score REAL,
+    line_item_count INTEGER NOT NULL DEFAULT 0,
+    processed_at TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+CREATE INDEX IF NOT EXISTS idx_invoices_vendor ON invoices (vendor, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_date ON invoices (invoice_date, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_risk ON invoices (risk_level, id);
+CREATE INDEX IF NOT EXISTS idx_invoices_action_hash ON invoices (action_hash);
+"""
+
+
+def normalize_date(value: str) -> str:
+    """Return the date zero-padded as YYYY-MM-DD so it compares correctly as text."""
+    return datetime.strptime(value, "%Y-%m-%d").strftime("%Y-%m-%d")
+
+
+def _stored_date(value: Any) -> Optional[str]:
+    # Dates that do not parse are stored as NULL so they never match a date filter wrongly
+    try:
+        return normalize_date(value)
+    except (TypeError, ValueError):
+        return None
+
+
+def encode_cursor(invoice_id: int) -> str:
+    """Encode the last seen invoice id as an opaque pagination cursor."""
+    return base64.urlsafe_b64encode(str(invoice_id).encode()).decode().rstrip("=")
+
+
+def decode_cursor(cursor: str) -> int:
+    """Decode a pagination cursor back into an invoice id."""
+    try:
+        padded = cursor + "=" * (-len(cursor) % 4)
+        invoice_id = int(base64.urlsafe_b64decode(padded.encode()).decode())
+    except (binascii.Error, UnicodeDecodeError, ValueError):
+        raise ValueError("Invalid cursor")
+    # Ids are positive SQLite integers; larger values would overflow the query binding
+    if not 0 < invoice_id < 2 ** 63:
+        raise ValueError("Invalid cursor")
+    return invoice_id
+
+
+class InvoiceStore:
+    """SQLite-backed history of processed invoices."""
+
+    def __init__(self, db_path: str):
+        self.db_path = db_path
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+        logger.info(f"Invoice store ready at: {db_path}")
+
+    @contextmanager
+    def _connect(self):
+        conn = sqlite3.connect(self.db_path)
+        conn.row_factory = sqlite3.Row
+        try:
+            yield conn
+            conn.commit()
+        finally:
+            conn.close()
+
+    def save(self, invoice_data: Dict[str, Any], risk_assessment: Dict[str, Any],
+             action_hash: str) -> int:
+        """Persist a processed invoice and return its id."""
+        payload = {
+            "invoice_data": invoice_data,
+            "risk_assessment": risk_assessment,
+            "action_hash": action_hash,
+        }
+        risk_level = risk_assessment.get("risk_level")
+        with self._connect() as conn:
+            cur = conn.execute(
+                "INSERT INTO invoices (action_hash, vendor, invoice_date, invoice_number, "
+                "total_amount, risk_level, confidence_score, line_item_count, processed_at, payload) "
+                "VALUES (?, ?, ?, ?, ?, ?, ?, ?, ?, ?)",
+                (
+                    action_hash,
+                    invoice_data.get("vendor"),
+                    _stored_date(invoice_data.get("date")),
+                    invoice_data.get("invoice_number"),
+                    invoice_data.get("total_amount"),
+                    risk_level.lower() if isinstance(risk_level, str) else None,
+                    risk_assessment.get("confidence_score"),
+                    len(invoice_data.get("line_items") or []),
+                    datetime.now(timezone.utc).isoformat(timespec="seconds"),
+                    json.dumps(payload),
+                ),
+            )
+            return cur.lastrowid
+
+    def latest_id(self) -> int:
+        """Return the id of the most recently stored invoice, or 0 if empty."""
+        with self._connect() as conn:
+            row = conn.execute("SELECT MAX(id) FROM invoices").fetchone()
+        return row[0] or 0
+
+    def list_summaries(self, limit: int = 20, cursor: Optional[str] = None,
+                       vendor: Optional[str] = None, date_from: Optional[str] = None,
+                       date_to: Optional[str] = None,
+                       risk_level: Optional[str] = None) -> Tuple[List[Dict[str, Any]], Optional[str]]:
+        """Return one page of invoice summaries, newest first, plus the next cursor."""
+        clauses = []
+        params: List[Any] = []
+        if cursor:
+            clauses.append("id < ?")
+            params.append(decode_cursor(cursor))
+        if vendor:
+            clauses.append("vendor = ?")
+            params.append(vendor)
+        if date_from:
+            clauses.append("invoice_date >= ?")
+            params.append(date_from)
+        if date_to:
+            clauses.append("invoice_date <= ?")
+            params.append(date_to)
+        if risk_level:
+            clauses.append("risk_level = ?")
+            params.append(risk_level.lower())
+
+        query = f"SELECT {', '.join(SUMMARY_COLUMNS)} FROM invoices"
+        if clauses:
+            query += " WHERE " + " AND ".join(clauses)
+        # Fetch one extra row to know whether another page exists
+        query += " ORDER BY id DESC LIMIT ?"
+        params.append(limit + 1)
+
+        with self._connect() as conn:
+            rows = conn.execute(query, params).fetchall()
+
+        items = [dict(row) for row in rows[:limit]]
+        next_cursor = encode_cursor(items[-1]["id"]) if len(rows) > limit else None
+        return items, next_cursor
+
+    def get(self, invoice_id: int) -> Optional[Dict[str, Any]]:
+        """Return the full stored result for an invoice, or None if missing."""
+        with self._connect() as conn:
+            row = conn.execute(
+                f"SELECT {', '.join(SUMMARY_COLUMNS)}, payload FROM invoices WHERE id = ?",
+                (invoice_id,),
+            ).fetchone()
+        if row is None:
+            return None
+        record = dict(row)
+        record.update(json.loads(record.pop("payload")))
+        return record
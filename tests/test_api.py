@@ -0,0 +1,108 @@
+import importlib
+
+import pytest
+
+from finguardai.store import InvoiceStore, encode_cursor
+
+
+@pytest.fixture(scope="module")
+def api(tmp_path_factory):
+    # api.py configures itself from the environment and working directory at import time
+    root = tmp_path_factory.mktemp("api")
+    with pytest.MonkeyPatch.context() as mp:
+        mp.chdir(root)
+        mp.setenv("MISTRAL_API_KEY", "test-key")
+        mp.setenv("FINGUARD_DB_PATH", str(root / "finguard.db"))
+        mp.setenv("FINGUARD_ANALYTICS_PATH", str(root / "analytics"))
+        module = importlib.import_module("finguardai.api")
+    return module
+
+
+@pytest.fixture
+def client(api, tmp_path, monkeypatch):
+    monkeypatch.setattr(api, "store", InvoiceStore(str(tmp_path / "invoices.db")))
+    return api.app.test_client()
+
+
+def save_invoice(api, vendor="Acme Corp", date="2025-06-13", risk_level="low"):
+    invoice_data = {
+        "vendor": vendor,
+        "date": date,
+        "invoice_number": "INV-1",
+        "total_amount": 100.0,
+        "line_items": [{"name": "Widget", "quantity": 1, "price": 100.0}],
+    }
+    risk_assessment = {"risk_level": risk_level, "confidence_score": 0.9, "findings": []}
+    return api.store.save(invoice_data, risk_assessment, api.generate_action_hash(invoice_data))
+
+
+def test_list_invoices_paginates(api, client):
+    ids = [save_invoice(api, date=f"2025-06-{day:02d}") for day in range(1, 4)]
+
+    response = client.get("/api/invoices?limit=2")
+    assert response.status_code == 200
+    data = response.get_json()["data"]
+    assert [item["id"] for item in data["invoices"]] == ids[:0:-1]
+    assert "invoice_data" not in data["invoices"][0]
+
+    response = client.get(f"/api/invoices?limit=2&cursor={data['next_cursor']}")
+    data = response.get_json()["data"]
+    assert [item["id"] for item in data["invoices"]] == [ids[0]]
+    assert data["next_cursor"] is None
+
+
+def test_list_invoices_normalizes_dates(api, client):
+    for day in range(1, 6):
+        save_invoice(api, date=f"2025-01-{day:02d}")
+    response = client.get("/api/invoices?date_from=2025-1-2&date_to=2025-1-4")
+    assert len(response.get_json()["data"]["invoices"]) == 3
+
+
+def test_list_invoices_etag(api, client):
+    save_invoice(api)
+    response = client.get("/api/invoices?vendor=acme corp")
+    etag = response.headers["ETag"]
+
+    cached = client.get("/api/invoices?vendor=acme corp", headers={"If-None-Match": etag})
+    assert cached.status_code == 304
+    assert cached.headers["ETag"] == etag
+
+    other_query = client.get("/api/invoices?vendor=other", headers={"If-None-Match": etag})
+    assert other_query.status_code == 200
+
+    save_invoice(api)
+    changed = client.get("/api/invoices?vendor=acme corp", headers={"If-None-Match": etag})
+    assert changed.status_code == 200
+    assert len(changed.get_json()["data"]["invoices"]) == 2
+
+
+@pytest.mark.parametrize("query", [
+    "limit=abc",
+    "limit=0",
+    "limit=101",
+    "date_from=13-06-2025",
+    "date_to=2025-02-30",
+    "risk_level=critical",
+    "cursor=not-a-cursor",
+    f"cursor={encode_cursor(10 ** 30)}",
+])
+def test_list_invoices_rejects_invalid_params(client, query):
+    response = client.get(f"/api/invoices?{query}")
+    assert response.status_code == 400
+    assert response.get_json()["success"] is False
+
+
+def test_get_invoice(api, client):
+    invoice_id = save_invoice(api)
+    response = client.get(f"/api/invoices/{invoice_id}")
+    assert response.status_code == 200
+    assert response.get_json()["data"]["invoice_data"]["vendor"] == "Acme Corp"
+
+    cached = client.get(f"/api/invoices/{invoice_id}",
+                        headers={"If-None-Match": response.headers["ETag"]})
+    assert cached.status_code == 304
+
+
+def test_get_missing_invoice(client):
+    response = client.get("/api/invoices/999")
+    assert response.status_code == 404
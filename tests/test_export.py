@@ -0,0 +1,232 @@
+import glob
+import json
+import os
+import threading
+
+import pyarrow.compute as pc
+import pyarrow.dataset as ds
+import pytest
+
+from finguardai.export import ParquetExporter, query, main
+
+
+def append_invoice(exporter, vendor="Acme Corp", date="2025-06-13", risk_level="low",
+                   total=100.0, findings=("Looks fine",)):
+    invoice_data = {
+        "vendor": vendor,
+        "date": date,
+        "invoice_number": "INV-1",
+        "total_amount": total,
+        "line_items": [
+            {"name": "Widget", "quantity": 1, "price": total / 2},
+            {"name": "Gadget", "quantity": 2, "price": total / 4},
+        ],
+    }
+    risk_assessment = {"risk_level": risk_level, "confidence_score": 0.9, "findings": list(findings)}
+    exporter.append(invoice_data, risk_assessment, f"hash-{vendor}-{date}")
+
+
+def part_files(root, table="invoices"):
+    return glob.glob(os.path.join(root, table, "**", "*.parquet"), recursive=True)
+
+
+@pytest.fixture
+def root(tmp_path):
+    return str(tmp_path / "analytics")
+
+
+@pytest.fixture
+def exporter(root):
+    return ParquetExporter(root, compact_min_files=2)
+
+
+def test_thread_starts_on_first_append(exporter, root):
+    assert exporter._thread is None
+    append_invoice(exporter)
+    assert exporter._thread.is_alive()
+
+    exporter.stop()
+    assert exporter._thread is None
+    assert query(root).num_rows == 1
+
+
+def test_stop_without_appends_writes_nothing(exporter, root):
+    exporter.stop()
+    assert os.listdir(root) == []
+
+
+def test_flush_partitions_by_date_and_vendor(exporter, root):
+    append_invoice(exporter, vendor="Acme Corp", date="2025-06-13")
+    append_invoice(exporter, vendor="Acme Corp", date="2025-06-14")
+    append_invoice(exporter, vendor="Other/Ltd", date="2025-06-13")
+    assert part_files(root) == []
+
+    exporter.flush()
+
+    partitions = sorted(os.path.relpath(os.path.dirname(path), os.path.join(root, "invoices"))
+                        for path in part_files(root))
+    assert partitions == [
+        os.path.join("date=2025-06-13", "vendor=Acme%20Corp"),
+        os.path.join("date=2025-06-13", "vendor=Other%2FLtd"),
+        os.path.join("date=2025-06-14", "vendor=Acme%20Corp"),
+    ]
+    assert query(root).num_rows == 3
+    assert query(root, "line_items").num_rows == 6
+    assert query(root, "findings").num_rows == 3
+
+
+def test_flush_quarantines_failed_partition(exporter, root, monkeypatch):
+    write_dataset = ds.write_dataset
+
+    def partial_write(table, base_dir, **kwargs):
+        # Write the good partitions, then fail the way a bad path would, leaving output behind
+        write_dataset(table.filter(pc.field("vendor") != "Bad"), base_dir, **kwargs)
+        if "Bad" in table.column("vendor").to_pylist():
+            raise OSError("File name too long")
+
+    monkeypatch.setattr(ds, "write_dataset", partial_write)
+    for _ in range(3):
+        append_invoice(exporter, vendor="Good")
+        append_invoice(exporter, vendor="Bad")
+        exporter.flush()
+
+    assert query(root).column("vendor").to_pylist() == ["Good"] * 3
+    assert query(root, "line_items").num_rows == 6
+    assert exporter._buffers == {"invoices": [], "line_items": [], "findings": []}
+    assert os.listdir(os.path.join(root, ".staging")) == []
+    with open(os.path.join(root, ".quarantine", "invoices.jsonl")) as f:
+        assert [json.loads(line)["vendor"] for line in f] == ["Bad"] * 3
+
+    exporter.compact()
+    assert query(root).num_rows == 3
+
+
+def test_flush_shortens_long_partition_values(exporter, root):
+    vendor = "Very Long Vendor Name " * 15
+    append_invoice(exporter, vendor=vendor)
+    exporter.flush()
+
+    [stored] = query(root).column("vendor").to_pylist()
+    assert stored.startswith("Very Long Vendor Name")
+    assert len(stored) <= 120
+    assert stored != vendor
+
+
+def test_compact_preserves_rows(exporter, root):
+    for total in (10.0, 20.0, 30.0):
+        append_invoice(exporter, total=total)
+        exporter.flush()
+    assert len(part_files(root)) == 3
+
+    exporter.compact()
+
+    assert len(part_files(root)) == 1
+    assert sorted(query(root).column("total_amount").to_pylist()) == [10.0, 20.0, 30.0]
+    assert query(root, "line_items").num_rows == 6
+
+
+def test_compact_finishes_interrupted_run(exporter, root, monkeypatch):
+    for _ in range(2):
+        append_invoice(exporter)
+        exporter.flush()
+    # Simulate a crash after the merged file is published but before sources are removed
+    monkeypatch.setattr(exporter, "_finish_compaction", lambda dirpath, journal_path: None)
+    exporter.compact()
+    assert query(root).num_rows == 4
+
+    monkeypatch.undo()
+    exporter.compact()
+    assert query(root).num_rows == 2
+
+
+def test_compact_skips_unreadable_partition(exporter, root):
+    for vendor in ("Acme", "Other"):
+        for _ in range(2):
+            append_invoice(exporter, vendor=vendor)
+            exporter.flush()
+    bad_partition = os.path.join(root, "invoices", "date=2025-06-13", "vendor=Acme")
+    with open(os.path.join(bad_partition, "part-corrupt-0.parquet"), "wb") as f:
+        f.write(b"PAR1")
+
+    exporter.compact()
+
+    assert len(os.listdir(bad_partition)) == 3
+    assert len(os.listdir(os.path.join(root, "invoices", "date=2025-06-13", "vendor=Other"))) == 1
+
+
+def test_query_waits_for_writers(exporter, root):
+    append_invoice(exporter)
+    exporter.flush()
+    results = []
+
+    with exporter._exclusive():
+        reader = threading.Thread(target=lambda: results.append(query(root).num_rows))
+        reader.start()
+        reader.join(0.2)
+        assert reader.is_alive()
+    reader.join()
+    assert results == [1]
+
+
+def test_query_filters(exporter, root):
+    append_invoice(exporter, vendor="Acme", date="2025-06-01", risk_level="high")
+    append_invoice(exporter, vendor="Acme", date="2025-06-10", risk_level="high")
+    append_invoice(exporter, vendor="Acme", date="2025-06-10", risk_level="low")
+    append_invoice(exporter, vendor="Other", date="2025-06-10", risk_level="high")
+    exporter.flush()
+
+    result = query(root, vendor="Acme", date_from="2025-06-05", date_to="2025-06-20",
+                   risk_level="HIGH", columns=["vendor", "date", "risk_level"])
+    assert result.to_pylist() == [{"vendor": "Acme", "date": "2025-06-10", "risk_level": "high"}]
+
+
+def test_query_missing_dataset_has_partition_columns(root):
+    result = query(root, "line_items")
+    assert result.num_rows == 0
+    assert {"date", "vendor"} <= set(result.column_names)
+
+
+def test_query_rejects_risk_level_on_line_items(root):
+    with pytest.raises(ValueError):
+        query(root, "line_items", risk_level="high")
+
+
+def test_cli_group_by_counts_null_groups(exporter, root):
+    append_invoice(exporter, vendor=None, total=7.0)
+    append_invoice(exporter, vendor="Acme", total=5.0)
+    append_invoice(exporter, vendor="Acme", total=5.0)
+    exporter.flush()
+
+    output = os.path.join(os.path.dirname(root), "by_vendor.csv")
+    main(["--root", root, "query", "invoices", "--group-by", "vendor",
+          "--sum", "total_amount", "--output", output])
+    with open(output) as f:
+        rows = sorted(f.read().splitlines()[1:])
+    assert rows == [",1,7.0", "Acme,2,10.0"]
+
+
+@pytest.mark.parametrize("args", [
+    ["query", "line_items", "--risk-level", "high"],
+    ["query", "invoices", "--columns", "missing"],
+    ["query", "invoices", "--date-from", "13-06-2025"],
+])
+def test_cli_reports_invalid_queries(root, args):
+    with pytest.raises(SystemExit) as exc:
+        main(["--root", root] + args)
+    assert exc.value.code == 2
+
+
+def test_flush_normalizes_partition_dates(exporter, root):
+    append_invoice(exporter, date="2025-6-13")
+    append_invoice(exporter, date="June 13, 2025")
+    exporter.flush()
+
+    assert query(root, date_from="2025-06-01", date_to="2025-06-30").num_rows == 1
+    assert sorted(query(root).column("date").to_pylist(), key=str) == ["2025-06-13", None]
+
+
+def test_cli_normalizes_dates(exporter, root, capsys):
+    append_invoice(exporter, date="2025-01-02")
+    exporter.flush()
+    main(["--root", root, "query", "invoices", "--date-from", "2025-1-2", "--columns", "date"])
+    assert "2025-01-02" in capsys.readouterr().out
@@ -0,0 +1,133 @@
+import pytest
+
+from finguardai.store import InvoiceStore, encode_cursor, decode_cursor
+
+
+def save_invoice(store, vendor="Acme Corp", date="2025-06-13", risk_level="low", total=100.0):
+    invoice_data = {
+        "vendor": vendor,
+        "date": date,
+        "invoice_number": "INV-1",
+        "total_amount": total,
+        "line_items": [{"name": "Widget", "quantity": 1, "price": total}],
+    }
+    risk_assessment = {"risk_level": risk_level, "confidence_score": 0.9, "findings": []}
+    return store.save(invoice_data, risk_assessment, f"hash-{vendor}-{date}")
+
+
+@pytest.fixture
+def store(tmp_path):
+    return InvoiceStore(str(tmp_path / "invoices.db"))
+
+
+def test_cursor_round_trip():
+    assert decode_cursor(encode_cursor(42)) == 42
+
+
+@pytest.mark.parametrize("cursor", [
+    "not base64!",
+    encode_cursor(1)[:-1] + "@",
+    "YWJj",
+    encode_cursor(0),
+    encode_cursor(-1),
+    encode_cursor(10 ** 30),
+])
+def test_decode_cursor_rejects_garbage(cursor):
+    with pytest.raises(ValueError):
+        decode_cursor(cursor)
+
+
+def test_empty_store(store):
+    assert store.latest_id() == 0
+    assert store.list_summaries() == ([], None)
+    assert store.get(1) is None
+
+
+def test_pages_cover_every_invoice_once(store):
+    ids = [save_invoice(store, date=f"2025-06-{day:02d}") for day in range(1, 6)]
+
+    first, cursor = store.list_summaries(limit=2)
+    assert [item["id"] for item in first] == ids[:-3:-1]
+    assert cursor is not None
+
+    second, cursor = store.list_summaries(limit=2, cursor=cursor)
+    assert [item["id"] for item in second] == ids[-3:-5:-1]
+
+    last, cursor = store.list_summaries(limit=2, cursor=cursor)
+    assert [item["id"] for item in last] == [ids[0]]
+    assert cursor is None
+
+
+def test_exact_page_has_no_next_cursor(store):
+    for _ in range(2):
+        save_invoice(store)
+    items, cursor = store.list_summaries(limit=2)
+    assert len(items) == 2
+    assert cursor is None
+
+
+def test_summary_projection(store):
+    invoice_id = save_invoice(store, risk_level="HIGH", total=250.0)
+    [summary], _ = store.list_summaries()
+    assert summary == {
+        "id": invoice_id,
+        "action_hash": "hash-Acme Corp-2025-06-13",
+        "vendor": "Acme Corp",
+        "invoice_date": "2025-06-13",
+        "invoice_number": "INV-1",
+        "total_amount": 250.0,
+        "risk_level": "high",
+        "confidence_score": 0.9,
+        "line_item_count": 1,
+        "processed_at": summary["processed_at"],
+    }
+
+
+def test_vendor_match_is_case_insensitive(store):
+    save_invoice(store, vendor="Acme Corp")
+    save_invoice(store, vendor="Other Ltd")
+    items, _ = store.list_summaries(vendor="ACME corp")
+    assert [item["vendor"] for item in items] == ["Acme Corp"]
+
+
+def test_combined_filters(store):
+    save_invoice(store, vendor="Acme", date="2025-06-01", risk_level="high")
+    match = save_invoice(store, vendor="Acme", date="2025-06-10", risk_level="high")
+    save_invoice(store, vendor="Acme", date="2025-06-10", risk_level="low")
+    save_invoice(store, vendor="Other", date="2025-06-10", risk_level="high")
+    save_invoice(store, vendor="Acme", date="2025-06-30", risk_level="high")
+
+    items, _ = store.list_summaries(
+        vendor="acme", date_from="2025-06-05", date_to="2025-06-20", risk_level="HIGH"
+    )
+    assert [item["id"] for item in items] == [match]
+
+
+def test_filters_apply_across_pages(store):
+    expected = [save_invoice(store, risk_level="high") for _ in range(3)]
+    save_invoice(store, risk_level="low")
+
+    first, cursor = store.list_summaries(limit=2, risk_level="high")
+    rest, cursor = store.list_summaries(limit=2, cursor=cursor, risk_level="high")
+    assert [item["id"] for item in first + rest] == expected[::-1]
+    assert cursor is None
+
+
+def test_save_normalizes_invoice_date(store):
+    padded = save_invoice(store, date="2025-6-13")
+    unparseable = save_invoice(store, vendor="Other", date="June 13, 2025")
+
+    items, _ = store.list_summaries(date_from="2025-06-01", date_to="2025-06-30")
+    assert [item["id"] for item in items] == [padded]
+    assert items[0]["invoice_date"] == "2025-06-13"
+    assert store.get(unparseable)["invoice_date"] is None
+    assert store.get(unparseable)["invoice_data"]["date"] == "June 13, 2025"
+
+
+def test_get_returns_full_payload(store):
+    invoice_id = save_invoice(store)
+    invoice = store.get(invoice_id)
+    assert invoice["id"] == invoice_id
+    assert invoice["invoice_data"]["line_items"] == [{"name": "Widget", "quantity": 1, "price": 100.0}]
+    assert invoice["risk_assessment"]["risk_level"] == "low"
+    assert store.latest_id() == invoice_id